@@ -1,5 +1,6 @@
 import ctypes
 import time
+from coordspace import CoordinateSpace, Win32Layout
 
 class POINT(ctypes.Structure):
     _fields_ = [("x", ctypes.c_long), ("y", ctypes.c_long)]
@@ -13,6 +14,10 @@ class AutoClicker:
     MOUSEEVENTF_MIDDLEDOWN = 0x0020
     MOUSEEVENTF_MIDDLEUP = 0x0040
     MOUSEEVENTF_WHEEL = 0x0800
+    MOUSEEVENTF_MOVE = 0x0001
+    MOUSEEVENTF_VIRTUALDESK = 0x4000
+    MOUSEEVENTF_ABSOLUTE = 0x8000
+    MOUSEEVENTF_MOVE_ABSOLUTE = MOUSEEVENTF_MOVE | MOUSEEVENTF_ABSOLUTE | MOUSEEVENTF_VIRTUALDESK
 
     # Key Event Constants
     KEYEVENTF_KEYUP = 0x0002
@@ -22,12 +27,16 @@ class AutoClicker:
     BUTTON_RIGHT = 2
     BUTTON_MIDDLE = 3
 
-    def __init__(self):
+    def __init__(self, layout=None, user32=None):
         self.delay_ms = 300.0
         self.x = 0
         self.y = 0
         # Access Windows User32 API
-        self.user32 = ctypes.windll.user32
+        self.user32 = user32 if user32 is not None else ctypes.windll.user32
+        # Monitor layout is re-read at the start of every run
+        if layout is None:
+            layout = Win32Layout(self.user32)
+        self.space = CoordinateSpace(layout)
 
     def getCursorPos(self):
         """Returns the current (x, y) tuple of the mouse cursor."""
@@ -77,14 +86,26 @@ class AutoClicker:
         self.x = int(x)
         self.y = int(y)
 
+    def prepareCoordinates(self, xs, ys):
+        """
+        Re-reads the monitor layout and precomputes normalized coordinates
+        for every x and y a macro can click.
+        """
+        self.space.prepare_axes(xs, ys)
+
+    def mouseEventAt(self, flags, data=0):
+        """
+        Sends a mouse event that also moves the cursor to the stored
+        coordinates, using normalized virtual desktop coordinates.
+        """
+        nx, ny = self.space.normalize(self.x, self.y)
+        self.user32.mouse_event(flags | self.MOUSEEVENTF_MOVE_ABSOLUTE, nx, ny, data, 0)
+
     def clickMouse(self, button, action_delay_ms, next_action_delay_ms):
         """
         Moves to stored coordinates, clicks the specified button,
         waits 250ms, releases, and waits for the configured delay.
         """
-        # Move actual cursor to self.x, self.y
-        self.user32.SetCursorPos(self.x, self.y)
-
         down_event = 0
         up_event = 0
 
@@ -99,8 +120,8 @@ class AutoClicker:
             up_event = self.MOUSEEVENTF_MIDDLEUP
         
         if down_event != 0:
-            # Press
-            self.user32.mouse_event(down_event, 0, 0, 0, 0)
+            # Move to self.x, self.y and press in the same event
+            self.mouseEventAt(down_event)
             time.sleep(action_delay_ms / 1000.0)
             # Release
             self.user32.mouse_event(up_event, 0, 0, 0, 0)
@@ -130,6 +151,16 @@ class AutoClicker:
         time.sleep(duration_ms / 1000.0)
         self.keyUp(vk_code)
 
+    def buttonDownFlag(self, button):
+        """Returns the button-down event flag for a button, or 0."""
+        if button == self.BUTTON_LEFT:
+            return self.MOUSEEVENTF_LEFTDOWN
+        elif button == self.BUTTON_RIGHT:
+            return self.MOUSEEVENTF_RIGHTDOWN
+        elif button == self.BUTTON_MIDDLE:
+            return self.MOUSEEVENTF_MIDDLEDOWN
+        return 0
+
     def mouseDown(self, button):
         """Presses a mouse button down."""
         if button == self.BUTTON_LEFT:
@@ -157,17 +188,13 @@ class AutoClicker:
     def mouseDrag(self, x1, y1, x2, y2, button, duration_ms):
         """Drag from (x1, y1) to (x2, y2)."""
         self.mouseMove(x1, y1)
-        # FORCE move to start position
-        self.user32.SetCursorPos(x1, y1)
-        
-        # Initial press and hold
-        self.mouseDown(button)
+        # Move to start position and press in the same event
+        self.mouseEventAt(self.buttonDownFlag(button))
         time.sleep(0.1) 
         
         # Move to end point
         self.mouseMove(x2, y2)
-        # Apply actual cursor movement
-        self.user32.SetCursorPos(x2, y2)
+        self.mouseEventAt(0)
         
         # Hold at end point
         if duration_ms > 0:
@@ -0,0 +1,113 @@
+import ctypes
+
+# DPI_AWARENESS_CONTEXT_PER_MONITOR_AWARE_V2
+DPI_AWARENESS_PER_MONITOR_V2 = -4
+
+
+def enable_dpi_awareness(user32=None):
+    """
+    Makes the process per-monitor DPI aware, so captured and replayed
+    coordinates are both physical pixels on scaled monitors.
+    Must be called before any window is created. Returns True on success.
+    """
+    if user32 is None:
+        user32 = ctypes.windll.user32
+    try:
+        return bool(user32.SetProcessDpiAwarenessContext(ctypes.c_void_p(DPI_AWARENESS_PER_MONITOR_V2)))
+    except AttributeError:
+        # Older than Windows 10 1703
+        return False
+
+
+class Win32Layout:
+    """Reads the virtual desktop layout from the Windows User32 API."""
+
+    # System Metrics Constants
+    SM_XVIRTUALSCREEN = 76
+    SM_YVIRTUALSCREEN = 77
+    SM_CXVIRTUALSCREEN = 78
+    SM_CYVIRTUALSCREEN = 79
+
+    def __init__(self, user32=None):
+        self.user32 = user32 if user32 is not None else ctypes.windll.user32
+
+    def query(self):
+        """Returns (left, top, width, height) of the virtual desktop."""
+        left = self.user32.GetSystemMetrics(self.SM_XVIRTUALSCREEN)
+        top = self.user32.GetSystemMetrics(self.SM_YVIRTUALSCREEN)
+        width = self.user32.GetSystemMetrics(self.SM_CXVIRTUALSCREEN)
+        height = self.user32.GetSystemMetrics(self.SM_CYVIRTUALSCREEN)
+        return left, top, width, height
+
+
+class FakeLayout:
+    """A fixed virtual desktop layout, for testing without Windows."""
+
+    def __init__(self, left=0, top=0, width=1920, height=1080):
+        self.layout = (left, top, width, height)
+        self.queries = 0
+
+    def query(self):
+        """Returns (left, top, width, height) of the virtual desktop."""
+        self.queries += 1
+        return self.layout
+
+
+class CoordinateSpace:
+    """
+    Maps desktop pixel coordinates to the normalized 0..65535 range used by
+    MOUSEEVENTF_ABSOLUTE | MOUSEEVENTF_VIRTUALDESK input events.
+    """
+
+    NORMALIZED_MAX = 65535
+
+    def __init__(self, layout):
+        self.layout = layout
+        self.refresh()
+
+    def refresh(self):
+        """Re-reads the desktop layout and drops the transform tables."""
+        self.left, self.top, self.width, self.height = self.layout.query()
+        self.x_table = {}
+        self.y_table = {}
+
+    def _axis(self, value, origin, size):
+        # Aim at the pixel centre so Windows' truncating conversion back,
+        # pixel = n * size // 65536, lands on the same pixel
+        size = max(size, 1)
+        n = ((value - origin) * 2 + 1) * 65536 // (size * 2)
+        return min(max(n, 0), self.NORMALIZED_MAX)
+
+    def prepare(self, actions):
+        """Precomputes the transform tables for a list of mouse actions."""
+        xs = set()
+        ys = set()
+        for action in actions:
+            if action["type"] != "mouse":
+                continue
+            xs.add(action["x"])
+            ys.add(action["y"])
+            if action.get("drag", False):
+                xs.add(action["end_x"])
+                ys.add(action["end_y"])
+        self.prepare_axes(xs, ys)
+
+    def prepare_axes(self, xs, ys):
+        """
+        Re-reads the layout, then precomputes the transform tables for the
+        given x and y values, so no arithmetic is left for the timing loop.
+        Called once per macro run.
+        """
+        self.refresh()
+        self.x_table = {x: self._axis(x, self.left, self.width) for x in xs}
+        self.y_table = {y: self._axis(y, self.top, self.height) for y in ys}
+
+    def normalize(self, x, y):
+        """Returns the normalized (x, y) for a desktop pixel coordinate."""
+        nx = self.x_table.get(x)
+        if nx is None:
+            nx = self.x_table[x] = self._axis(x, self.left, self.width)
+        ny = self.y_table.get(y)
+        if ny is None:
+            ny = self.y_table[y] = self._axis(y, self.top, self.height)
+        return nx, ny
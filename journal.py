@@ -0,0 +1,128 @@
+import gzip
+import json
+import os
+import queue
+import shutil
+import threading
+import time
+
+
+class RunJournal:
+    """
+    Writes structured run records as JSON lines from a background thread.
+    The engine only enqueues records; it never touches the file.
+    """
+
+    def __init__(self, path, max_bytes=5 * 1024 * 1024, backup_count=5,
+                 compress=False, queue_size=10000, batch_size=256, linger=0.25):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.compress = compress
+        self.batch_size = batch_size
+        # Seconds to keep collecting records before writing a batch
+        self.linger = linger
+        self.queue = queue.Queue(maxsize=queue_size)
+        # Only ever incremented by record(); the writer reports the difference
+        self.dropped = 0
+        # Set by the writer if the file cannot be opened or written
+        self.error = None
+        self._stop = object()
+        self._thread = threading.Thread(target=self._writer, name="RunJournal", daemon=True)
+        self._thread.start()
+
+    def record(self, event, **fields):
+        """
+        Queues one record. Never blocks: if the writer falls behind and the
+        queue is full, the record is dropped and counted instead.
+        """
+        if self.error is not None:
+            return
+        fields["ts"] = time.time()
+        fields["event"] = event
+        try:
+            self.queue.put_nowait(fields)
+        except queue.Full:
+            self.dropped += 1
+
+    def close(self):
+        """Flushes pending records and stops the writer thread."""
+        while self._thread.is_alive():
+            try:
+                self.queue.put(self._stop, timeout=0.1)
+                break
+            except queue.Full:
+                continue
+        self._thread.join()
+
+    def _writer(self):
+        try:
+            self._write_batches()
+        except OSError as e:
+            # Stop journaling; record() checks this and the UI reports it
+            self.error = e
+
+    def _write_batches(self):
+        reported_dropped = 0
+        f = self._open()
+        try:
+            while True:
+                # Block for the first record, then keep collecting until the
+                # batch is full, the linger time is up or the journal closes
+                batch = [self.queue.get()]
+                deadline = time.monotonic() + self.linger
+                while len(batch) < self.batch_size and batch[-1] is not self._stop:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    try:
+                        batch.append(self.queue.get(timeout=remaining))
+                    except queue.Empty:
+                        break
+
+                stop = self._stop in batch
+                lines = "".join(json.dumps(r) + "\n" for r in batch if r is not self._stop)
+                dropped = self.dropped
+                if dropped != reported_dropped:
+                    lines += json.dumps({"ts": time.time(), "event": "dropped", "count": dropped - reported_dropped}) + "\n"
+                    reported_dropped = dropped
+
+                f.write(lines)
+                f.flush()
+                if f.tell() >= self.max_bytes:
+                    f.close()
+                    self._rotate()
+                    f = self._open()
+
+                if stop:
+                    break
+        finally:
+            f.close()
+
+    def _open(self):
+        return open(self.path, "a", encoding="utf-8", buffering=64 * 1024)
+
+    def _rotated_name(self, n):
+        name = f"{self.path}.{n}"
+        return name + ".gz" if self.compress else name
+
+    def _rotate(self):
+        """Shifts journal.1 .. journal.N and moves the current file to journal.1."""
+        if self.backup_count <= 0:
+            os.remove(self.path)
+            return
+
+        oldest = self._rotated_name(self.backup_count)
+        if os.path.exists(oldest):
+            os.remove(oldest)
+        for n in range(self.backup_count - 1, 0, -1):
+            src = self._rotated_name(n)
+            if os.path.exists(src):
+                os.replace(src, self._rotated_name(n + 1))
+
+        if self.compress:
+            with open(self.path, "rb") as src, gzip.open(self._rotated_name(1), "wb") as dst:
+                shutil.copyfileobj(src, dst)
+            os.remove(self.path)
+        else:
+            os.replace(self.path, self._rotated_name(1))
@@ -1,17 +1,46 @@
+import os
+import queue
 import time
 import tkinter as tk
-from tkinter import ttk, scrolledtext, simpledialog, messagebox
+from tkinter import ttk, scrolledtext, simpledialog, messagebox, filedialog
 import threading
 from autoclicker import AutoClicker
+from coordspace import enable_dpi_awareness
+from journal import RunJournal
+from progress import RunProgress, nominal_ms
+from templates import (
+    TEMPLATE_GRID, TEMPLATE_OFFSETS, TEMPLATE_CSV,
+    TemplateRun, csv_count, parse_offsets, format_offsets, describe_template,
+    expand_actions, actions_per_loop, coordinate_axes
+)
+
+class EmergencyStop(Exception):
+    """Raised by the engine when PAUSE BREAK is pressed."""
+
 
 class MacroApp:
+    # Progress display refresh interval (~10 fps)
+    PROGRESS_INTERVAL_MS = 100
+    # Status line text for each run outcome
+    RUN_STATUS_TEXT = {"finished": "Done", "stopped": "Stopped", "error": "Error"}
+
     def __init__(self, root):
         self.root = root
         self.root.title("Python Macro Generator")
-        self.root.geometry("340x600") 
+        self.root.geometry("340x660") 
 
         self.bot = AutoClicker()
         self.actions = []
+        # Persistent run records, written off the engine thread
+        journal_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "macro_journal.jsonl")
+        self.journal = RunJournal(journal_path, compress=True)
+        self.journal_error_shown = False
+        self.macro_thread = None
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+        # Counters published by the engine, sampled by the UI
+        self.progress = RunProgress()
+        # Log lines from the engine thread, drained by the Tk thread
+        self.log_queue = queue.Queue()
 
         # --- Control Frame ---
         control_frame = ttk.LabelFrame(root, text="Settings", padding=10)
@@ -74,10 +103,17 @@ class MacroApp:
 
         ttk.Button(main_btn_frame, text="Add Mouse Action", command=self.add_mouse_action).pack(fill="x", pady=2)
         ttk.Button(main_btn_frame, text="Add Key Action", command=self.add_key_action).pack(fill="x", pady=2)
+        ttk.Button(main_btn_frame, text="Add Template Action", command=self.add_template_action).pack(fill="x", pady=2)
         
         self.run_btn = ttk.Button(main_btn_frame, text="RUN MACRO", command=self.start_macro_thread)
         self.run_btn.pack(fill="x", pady=5)
 
+        # --- Progress ---
+        self.progress_bar = ttk.Progressbar(main_btn_frame, mode="determinate", maximum=1.0)
+        self.progress_bar.pack(fill="x", pady=2)
+        self.progress_var = tk.StringVar(value="Idle")
+        ttk.Label(main_btn_frame, textvariable=self.progress_var).pack(fill="x")
+
         # --- Logs UI (Tab 2) ---
         self.log_area = scrolledtext.ScrolledText(self.tab_logs, width=70, height=20)
         self.log_area.pack(padx=10, pady=10, fill="both", expand=True)
@@ -90,10 +126,37 @@ class MacroApp:
         self.tree.bind("<Double-1>", lambda e: self.edit_action())
         self.drag_item = None
 
+    def on_close(self):
+        # Closing mid-run would drop the run's final journal records
+        if self.macro_thread is not None and self.macro_thread.is_alive():
+            messagebox.showwarning("Macro Running", "Stop the macro with PAUSE BREAK before closing.")
+            return
+        self.journal.close()
+        self.root.destroy()
+
+    def check_journal(self):
+        if self.journal.error is not None and not self.journal_error_shown:
+            self.journal_error_shown = True
+            self.log(f"Warning: run journal disabled: {self.journal.error}")
+
     def log(self, message):
         self.log_area.insert(tk.END, message + "\n")
         self.log_area.see(tk.END)
 
+    def post_log(self, message):
+        # Safe from any thread; shown on the next progress sample
+        self.log_queue.put(message)
+
+    def drain_log(self):
+        lines = []
+        while True:
+            try:
+                lines.append(self.log_queue.get_nowait())
+            except queue.Empty:
+                break
+        if lines:
+            self.log("\n".join(lines))
+
     def refresh_list(self):
         # Clear current list
         for item in self.tree.get_children():
@@ -130,6 +193,9 @@ class MacroApp:
                 codes = action["codes"]
                 names = [self.bot.getKeyName(k) for k in codes]
                 details = f"Shortcut {' + '.join(names)}"
+
+            elif t == "template":
+                details = describe_template(action)
             
             self.tree.insert("", "end", iid=str(i), values=(t.upper(), details, f"{dur}ms"))
 
@@ -452,6 +518,225 @@ class MacroApp:
         btn_text = "Save Changes" if edit_index is not None else "Add Action"
         ttk.Button(popup, text=btn_text, command=on_add).pack(pady=10)
 
+    def add_template_action(self, edit_index=None):
+        # Create custom popup
+        popup = tk.Toplevel(self.root)
+        popup.title("Edit Template Action" if edit_index is not None else "Add Template Action")
+        popup.geometry("320x420")
+        popup.transient(self.root)
+        popup.grab_set()
+
+        # Center relative to parent
+        x = self.root.winfo_x() + (self.root.winfo_width() // 2) - (320 // 2)
+        y = self.root.winfo_y() + (self.root.winfo_height() // 2) - (420 // 2)
+        popup.geometry(f"+{x}+{y}")
+
+        # Default values
+        def_kind = TEMPLATE_GRID
+        def_btn = 1
+        def_x = 0
+        def_y = 0
+        def_rows = 1
+        def_cols = 1
+        def_dx = 0
+        def_dy = 0
+        def_offsets = ""
+        def_path = ""
+        def_dur = 100
+        def_per_loop = False
+
+        # Load if editing
+        if edit_index is not None:
+            a = self.actions[edit_index]
+            def_kind = a["template"]
+            def_btn = a.get("button", 1)
+            def_x = a.get("x", 0)
+            def_y = a.get("y", 0)
+            def_rows = a.get("rows", 1)
+            def_cols = a.get("cols", 1)
+            def_dx = a.get("dx", 0)
+            def_dy = a.get("dy", 0)
+            def_offsets = format_offsets(a.get("offsets", []))
+            def_path = a.get("path", "")
+            def_dur = a.get("duration", 100)
+            def_per_loop = a.get("per_loop", False)
+
+        ttk.Label(popup, text="Template:").pack(pady=2)
+        kind_var = tk.StringVar(value=def_kind)
+
+        # Function to toggle fields
+        def toggle_fields():
+            kind = kind_var.get()
+            grid_frame.pack_forget()
+            offsets_frame.pack_forget()
+            csv_frame.pack_forget()
+            if kind == TEMPLATE_GRID:
+                base_frame.pack(pady=5, after=kind_frame)
+                grid_frame.pack(pady=5, after=base_frame)
+            elif kind == TEMPLATE_OFFSETS:
+                base_frame.pack(pady=5, after=kind_frame)
+                offsets_frame.pack(pady=5, after=base_frame)
+            else: # CSV
+                base_frame.pack_forget()
+                csv_frame.pack(pady=5, after=kind_frame)
+
+        kind_frame = ttk.Frame(popup)
+        kind_frame.pack()
+        ttk.Radiobutton(kind_frame, text="Grid", variable=kind_var, value=TEMPLATE_GRID, command=toggle_fields).pack(side="left")
+        ttk.Radiobutton(kind_frame, text="Offsets", variable=kind_var, value=TEMPLATE_OFFSETS, command=toggle_fields).pack(side="left")
+        ttk.Radiobutton(kind_frame, text="CSV", variable=kind_var, value=TEMPLATE_CSV, command=toggle_fields).pack(side="left")
+
+        # --- Base Point Frame ---
+        base_frame = ttk.Frame(popup)
+        base_frame.pack(pady=5)
+
+        ttk.Label(base_frame, text="Move mouse and press CTRL for Base Point").pack(pady=2)
+
+        xy_frame = ttk.Frame(base_frame)
+        xy_frame.pack(pady=2)
+
+        ttk.Label(xy_frame, text="Base X:").grid(row=0, column=0)
+        x_var = tk.IntVar(value=def_x)
+        ttk.Entry(xy_frame, textvariable=x_var, width=8).grid(row=0, column=1, padx=5)
+
+        ttk.Label(xy_frame, text="Base Y:").grid(row=0, column=2)
+        y_var = tk.IntVar(value=def_y)
+        ttk.Entry(xy_frame, textvariable=y_var, width=8).grid(row=0, column=3, padx=5)
+
+        # --- Grid Frame ---
+        grid_frame = ttk.Frame(popup)
+
+        ttk.Label(grid_frame, text="Rows:").grid(row=0, column=0)
+        rows_var = tk.IntVar(value=def_rows)
+        ttk.Entry(grid_frame, textvariable=rows_var, width=8).grid(row=0, column=1, padx=5)
+
+        ttk.Label(grid_frame, text="Cols:").grid(row=0, column=2)
+        cols_var = tk.IntVar(value=def_cols)
+        ttk.Entry(grid_frame, textvariable=cols_var, width=8).grid(row=0, column=3, padx=5)
+
+        ttk.Label(grid_frame, text="Step X:").grid(row=1, column=0)
+        dx_var = tk.IntVar(value=def_dx)
+        ttk.Entry(grid_frame, textvariable=dx_var, width=8).grid(row=1, column=1, padx=5)
+
+        ttk.Label(grid_frame, text="Step Y:").grid(row=1, column=2)
+        dy_var = tk.IntVar(value=def_dy)
+        ttk.Entry(grid_frame, textvariable=dy_var, width=8).grid(row=1, column=3, padx=5)
+
+        # --- Offsets Frame ---
+        offsets_frame = ttk.Frame(popup)
+
+        ttk.Label(offsets_frame, text="Offsets (dx,dy; dx,dy; ...):").pack(pady=2)
+        offsets_var = tk.StringVar(value=def_offsets)
+        ttk.Entry(offsets_frame, textvariable=offsets_var, width=30).pack()
+
+        # --- CSV Frame ---
+        csv_frame = ttk.Frame(popup)
+
+        ttk.Label(csv_frame, text="CSV File (one x,y per row):").pack(pady=2)
+        path_var = tk.StringVar(value=def_path)
+        ttk.Entry(csv_frame, textvariable=path_var, width=30).pack(side="left", padx=2)
+
+        def browse():
+            path = filedialog.askopenfilename(parent=popup, filetypes=[("CSV Files", "*.csv"), ("All Files", "*.*")])
+            if path:
+                path_var.set(path)
+
+        ttk.Button(csv_frame, text="...", width=3, command=browse).pack(side="left")
+
+        # Duration, button and loop binding
+        common_frame = ttk.Frame(popup)
+        common_frame.pack(pady=5, side="bottom", fill="x") # Pack common fields at bottom
+
+        btn_var = tk.IntVar(value=def_btn)
+        btn_frame = ttk.Frame(common_frame)
+        btn_frame.pack(side="top")
+        ttk.Radiobutton(btn_frame, text="Left", variable=btn_var, value=1).pack(side="left")
+        ttk.Radiobutton(btn_frame, text="Right", variable=btn_var, value=2).pack(side="left")
+        ttk.Radiobutton(btn_frame, text="Mid", variable=btn_var, value=3).pack(side="left")
+
+        per_loop_var = tk.BooleanVar(value=def_per_loop)
+        ttk.Checkbutton(common_frame, text="Loop N uses row / point N only", variable=per_loop_var).pack(side="top", pady=5)
+
+        ttk.Label(common_frame, text="Hold Duration (ms):").pack(side="top")
+        dur_var = tk.IntVar(value=def_dur)
+        ttk.Entry(common_frame, textvariable=dur_var, width=10).pack(side="top")
+
+        # Trigger toggle to set initial correct state
+        toggle_fields()
+
+        # Add Button
+        btn_text = "Save Changes" if edit_index is not None else "Add Action"
+        ttk.Button(common_frame, text=btn_text, command=lambda: on_add()).pack(pady=10, side="bottom")
+
+        # Polling for Ctrl key
+        def check_input():
+            if not popup.winfo_exists(): return
+
+            # 0x11 is VK_CONTROL (Base Point)
+            if self.bot.isKeyPressed(0x11):
+                mx, my = self.bot.getCursorPos()
+                x_var.set(mx)
+                y_var.set(my)
+
+            popup.after(50, check_input)
+
+        check_input()
+
+        def on_add():
+            try:
+                kind = kind_var.get()
+                action = {
+                    "type": "template",
+                    "template": kind,
+                    "button": btn_var.get(),
+                    "duration": dur_var.get(),
+                    "per_loop": per_loop_var.get()
+                }
+
+                if kind == TEMPLATE_GRID:
+                    action.update({
+                        "x": x_var.get(),
+                        "y": y_var.get(),
+                        "rows": rows_var.get(),
+                        "cols": cols_var.get(),
+                        "dx": dx_var.get(),
+                        "dy": dy_var.get()
+                    })
+                    if action["rows"] <= 0 or action["cols"] <= 0:
+                        raise ValueError("Rows and columns must be positive.")
+                elif kind == TEMPLATE_OFFSETS:
+                    action.update({
+                        "x": x_var.get(),
+                        "y": y_var.get(),
+                        "offsets": parse_offsets(offsets_var.get())
+                    })
+                    if not action["offsets"]:
+                        raise ValueError("No offsets given.")
+                elif kind == TEMPLATE_CSV:
+                    if not path_var.get():
+                        raise ValueError("No CSV file selected.")
+                    if not os.path.isfile(path_var.get()):
+                        raise ValueError("CSV file not found.")
+                    if csv_count(path_var.get()) == 0:
+                        raise ValueError("CSV file has no x,y rows.")
+                    action["path"] = path_var.get()
+
+                desc = describe_template(action)
+
+                if edit_index is not None:
+                    self.actions[edit_index] = action
+                    self.log(f"Edited: Template {desc}")
+                else:
+                    self.actions.append(action)
+                    self.log(f"Added: Template {desc}")
+
+                self.refresh_list()
+                popup.destroy()
+            except ValueError as e:
+                messagebox.showerror("Error", str(e))
+            except (tk.TclError, OSError):
+                messagebox.showerror("Error", "Invalid template parameters")
+
     def reset_actions(self):
         self.actions.clear()
         self.refresh_list() # Clear the list view too
@@ -469,32 +754,83 @@ class MacroApp:
             self.add_mouse_action(edit_index=idx)
         elif action["type"] in ["key", "shortcut"]:
             self.add_key_action(edit_index=idx)
+        elif action["type"] == "template":
+            self.add_template_action(edit_index=idx)
 
     def start_macro_thread(self):
-        t = threading.Thread(target=self.run_macro)
-        t.start()
-
+        try:
+            loops = self.loop_var.get()
+            delay = self.delay_var.get()
+        except tk.TclError:
+            messagebox.showerror("Error", "Invalid loops or delay")
+            return
 
-    def run_macro(self):
-        loops = self.loop_var.get()
-        delay = self.delay_var.get()
-        
         self.run_btn.config(state="disabled")
-        self.log(f"--- Starting Macro ({loops} Loops) ---")
-        self.log("Press PAUSE BREAK to Emergency Stop")
+        # The engine publishes the per-loop action count once it has counted
+        self.progress.start(loops, 0)
+        self.check_journal()
+        self.macro_thread = threading.Thread(target=self.run_macro, args=(loops, delay))
+        self.macro_thread.start()
+        self.update_progress()
+
+    def update_progress(self):
+        # Sampled at a fixed frame rate; the engine never touches widgets.
+        # Read running before draining so no final log line is missed.
+        p = self.progress
+        running = p.running
+        self.drain_log()
+        fraction, rate, eta = p.sample()
+        self.progress_bar["value"] = fraction
+
+        if running:
+            eta_str = "--:--" if eta is None else f"{int(eta) // 60}:{int(eta) % 60:02d}"
+            self.progress_var.set(
+                f"Loop {p.loop}/{p.loops} | Action {p.action_index} | "
+                f"{rate:.1f}/s | ETA {eta_str} | Late {p.lateness_ms:.0f}ms"
+            )
+            self.root.after(self.PROGRESS_INTERVAL_MS, self.update_progress)
+        else:
+            outcome = self.RUN_STATUS_TEXT.get(p.status, "Done")
+            self.progress_var.set(f"{outcome}: {p.actions_done} actions")
+            self.check_journal()
+            self.run_btn.config(state="normal")
+
+
+    def run_macro(self, loops, delay):
+        # Runs on the engine thread: only post_log and progress counters here
+        self.post_log(f"--- Starting Macro ({loops} Loops) ---")
+        self.post_log("Press PAUSE BREAK to Emergency Stop")
         
         time.sleep(1) 
         
+        run_start = time.perf_counter()
+        status = "finished"
+        self.journal.record("run_start", loops=loops, delay_ms=delay, actions=len(self.actions))
+        # Open CSV readers and counts for the templates, kept for this run only
+        template_run = TemplateRun()
+
         try:
+            # Build the coordinate transform tables and the per-loop count from
+            # the template parameters, without expanding the templates
+            xs, ys = coordinate_axes(self.actions, template_run)
+            self.bot.prepareCoordinates(xs, ys)
+            self.progress.actions_per_loop = actions_per_loop(self.actions, template_run)
+
             for l in range(loops):
                 if self.bot.isKeyPressed(0x13): 
-                    raise Exception("Emergency Stop Triggered!")
-
-                self.log(f"Loop {l + 1}/{loops}")
-                for i, action in enumerate(self.actions):
+                    raise EmergencyStop("Emergency Stop Triggered!")
+
+                self.post_log(f"Loop {l + 1}/{loops}")
+                self.journal.record("loop_start", loop=l + 1)
+                self.progress.loop = l + 1
+                loop_start = time.perf_counter()
+                # Templates are expanded lazily, one point at a time
+                for i, action in enumerate(expand_actions(self.actions, l, template_run)):
                     if self.bot.isKeyPressed(0x13): 
-                        raise Exception("Emergency Stop Triggered!")
+                        raise EmergencyStop("Emergency Stop Triggered!")
 
+                    self.progress.action_index = i + 1
+                    action_start = time.perf_counter()
                     if action["type"] == "mouse":
                         # Check if it is a drag action
                         if action.get("drag", False):
@@ -504,41 +840,66 @@ class MacroApp:
                                 action["end_x"], action["end_y"],
                                 action["button"], dur
                             )
-                            self.log(f"  Executed: Drag ({action['x']},{action['y']}) -> ({action['end_x']},{action['end_y']})")
+                            self.post_log(f"  Executed: Drag ({action['x']},{action['y']}) -> ({action['end_x']},{action['end_y']})")
                         elif action["button"] == 4:
                             # Scroll
                             amount = action.get("scroll_amount", 0)
                             self.bot.mouseScroll(amount)
-                            self.log(f"  Executed: Mouse Scroll {amount}")
+                            self.post_log(f"  Executed: Mouse Scroll {amount}")
                         else:
                             self.bot.mouseMove(action["x"], action["y"])
                             # Use mapped duration or default 100
                             dur = action.get("duration", 100)
                             self.bot.clickMouse(action["button"], dur, delay)
-                            self.log(f"  Executed: Mouse Click ({action['x']}, {action['y']}) for {dur}ms")
+                            self.post_log(f"  Executed: Mouse Click ({action['x']}, {action['y']}) for {dur}ms")
                     
                     elif action["type"] == "key":
                         dur = action.get("duration", 100)
                         self.bot.keyPress(action["code"], dur)
                         time.sleep(delay / 1000.0)
-                        self.log(f"  Executed: Key Press {action['code']} for {dur}ms")
+                        self.post_log(f"  Executed: Key Press {action['code']} for {dur}ms")
                         
                     elif action["type"] == "shortcut":
                         dur = action.get("duration", 100)
                         self.bot.shortcut(action["codes"], dur)
                         time.sleep(delay / 1000.0)
                         names = [self.bot.getKeyName(k) for k in action["codes"]]
-                        self.log(f"  Executed: Shortcut {'+'.join(names)} for {dur}ms")
+                        self.post_log(f"  Executed: Shortcut {'+'.join(names)} for {dur}ms")
+
+                    elapsed_ms = (time.perf_counter() - action_start) * 1000.0
+                    self.progress.lateness_ms = max(elapsed_ms - nominal_ms(action, delay), 0.0)
+                    self.progress.actions_done += 1
+                    self.journal.record(
+                        "action", loop=l + 1, index=i + 1, type=action["type"],
+                        elapsed_ms=elapsed_ms
+                    )
+
+                self.journal.record("loop_end", loop=l + 1, elapsed_ms=(time.perf_counter() - loop_start) * 1000.0)
             
-            self.log("--- Macro Finished ---")
+            self.post_log("--- Macro Finished ---")
+
+        except EmergencyStop as e:
+            status = "stopped"
+            self.post_log(f"Error: {e}")
 
         except Exception as e:
-            self.log(f"Error: {e}")
+            status = "error"
+            self.post_log(f"Error: {e}")
+            self.journal.record("error", message=str(e))
         
         finally:
-            self.run_btn.config(state="normal")
+            template_run.close()
+            self.journal.record("run_stop", status=status, elapsed_ms=(time.perf_counter() - run_start) * 1000.0)
+            # The Tk thread shows the outcome and re-enables the run button
+            # on its next sample
+            self.progress.status = status
+            self.progress.running = False
 
 if __name__ == "__main__":
+    # Must happen before Tk creates any window
+    dpi_aware = enable_dpi_awareness()
     root = tk.Tk()
     app = MacroApp(root)
+    if not dpi_aware:
+        app.log("Warning: could not enable DPI awareness, clicks may be offset on scaled displays")
     root.mainloop()
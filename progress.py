@@ -0,0 +1,73 @@
+import time
+
+
+class RunProgress:
+    """
+    Counters shared between the engine thread and the Tk thread.
+    The engine only assigns plain attributes (atomic under the GIL);
+    the Tk thread reads them with sample() at its own frame rate.
+    """
+
+    # Weight of the newest sample in the live actions/s average
+    RATE_SMOOTHING = 0.3
+
+    def __init__(self):
+        self.start(0, 0)
+        self.running = False
+
+    def start(self, loops, actions_per_loop):
+        """Resets the counters for a new run. Called before the engine starts."""
+        self.loops = loops
+        self.actions_per_loop = actions_per_loop
+        self.loop = 0
+        self.action_index = 0
+        self.actions_done = 0
+        self.lateness_ms = 0.0
+        self.started = time.perf_counter()
+        # "finished", "stopped" or "error", set by the engine before running is cleared
+        self.status = None
+        self.running = True
+
+        # Sampler state, only touched by the Tk thread
+        self._last_done = 0
+        self._last_time = self.started
+        self.rate = 0.0
+
+    def sample(self):
+        """
+        Returns (fraction, actions/s, eta seconds or None) from the current
+        counters. Must only be called from the Tk thread.
+        """
+        now = time.perf_counter()
+        done = self.actions_done
+
+        dt = now - self._last_time
+        if dt > 0:
+            instant = (done - self._last_done) / dt
+            self.rate += self.RATE_SMOOTHING * (instant - self.rate)
+        self._last_done = done
+        self._last_time = now
+
+        total = self.loops * self.actions_per_loop
+        if total <= 0:
+            return 0.0, self.rate, None
+        fraction = min(done / total, 1.0)
+
+        # ETA from the average over the whole run, which is steadier than the live rate
+        elapsed = now - self.started
+        eta = None
+        if done > 0 and elapsed > 0:
+            eta = (total - done) / (done / elapsed)
+        return fraction, self.rate, eta
+
+
+def nominal_ms(action, delay):
+    """Returns how long an action is expected to take, in milliseconds."""
+    dur = action.get("duration", 100)
+    if action["type"] == "mouse":
+        if action.get("drag", False):
+            # mouseDrag waits 100ms after pressing
+            return 100 + dur
+        if action["button"] == 4:
+            return 0
+    return dur + delay
@@ -0,0 +1,322 @@
+import csv
+import itertools
+
+# Template Kinds
+TEMPLATE_GRID = "grid"
+TEMPLATE_OFFSETS = "offsets"
+TEMPLATE_CSV = "csv"
+
+TEMPLATE_KINDS = (TEMPLATE_GRID, TEMPLATE_OFFSETS, TEMPLATE_CSV)
+
+
+def grid_points(x, y, rows, cols, dx, dy, row=None):
+    """
+    Yields (x, y) for every cell of a rows x cols grid starting at (x, y).
+    If row is given, only that row (wrapped by rows) is yielded.
+    """
+    rows = int(rows)
+    cols = int(cols)
+    if rows <= 0 or cols <= 0:
+        return
+
+    # Compute the column and row axes once, then pair them lazily
+    xs = [int(x) + c * int(dx) for c in range(cols)]
+    ys = [int(y) + r * int(dy) for r in range(rows)]
+    if row is not None:
+        ys = [ys[row % rows]]
+
+    for py, px in itertools.product(ys, xs):
+        yield px, py
+
+
+def offset_points(x, y, offsets, index=None):
+    """
+    Yields (x, y) for each (dx, dy) offset from the base point (x, y).
+    If index is given, only that offset (wrapped by the count) is yielded.
+    """
+    if not offsets:
+        return
+    if index is not None:
+        offsets = [offsets[index % len(offsets)]]
+
+    for dx, dy in offsets:
+        yield int(x) + int(dx), int(y) + int(dy)
+
+
+def csv_points(path, index=None, count=None):
+    """
+    Streams (x, y) pairs from a CSV file, one point per row.
+    Rows whose first two cells are not integers (e.g. a header) are skipped.
+    If index is given, only that point (wrapped by the count) is yielded;
+    pass count to avoid counting the rows again. Runs should use
+    TemplateRun instead, which does not rescan the file every loop.
+    """
+    if index is None:
+        yield from _read_csv_points(path)
+        return
+
+    if count is None:
+        count = csv_count(path)
+    if count <= 0:
+        return
+    # Stream up to the selected row instead of loading the whole file
+    yield from itertools.islice(_read_csv_points(path), index % count, index % count + 1)
+
+
+def csv_count(path):
+    """Returns the number of points in a CSV file."""
+    return sum(1 for _ in _read_csv_points(path))
+
+
+def _parse_row(row):
+    """Returns (x, y) for a CSV row, or None if it is not a point."""
+    if len(row) < 2:
+        return None
+    try:
+        return int(row[0]), int(row[1])
+    except ValueError:
+        return None
+
+
+def _read_csv_points(path):
+    with open(path, newline="") as f:
+        for row in csv.reader(f):
+            point = _parse_row(row)
+            if point is not None:
+                yield point
+
+
+class _CsvCursor:
+    """
+    An open reader over a CSV file that advances one point per loop,
+    reopening the file only when it wraps around.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.points = None
+        self.loop = None
+        self.current = None
+
+    def point(self, loop_index):
+        # Loops advance one at a time; repeated calls for a loop reuse its point
+        if loop_index != self.loop:
+            self.loop = loop_index
+            self.current = self._advance()
+        return self.current
+
+    def _advance(self):
+        if self.points is not None:
+            point = next(self.points, None)
+            if point is not None:
+                return point
+            self.points.close()
+        # First use or end of file: start again from the top
+        self.points = _read_csv_points(self.path)
+        return next(self.points, None)
+
+    def close(self):
+        if self.points is not None:
+            self.points.close()
+            self.points = None
+
+
+class TemplateRun:
+    """
+    Per-run state for expanding templates: cached CSV row counts and one
+    open reader per per-loop CSV template. Close it when the run ends.
+    """
+
+    def __init__(self):
+        self.csv_scans = {}
+        self.cursors = {}
+
+    def scan_csv(self, path):
+        """
+        Returns (count, xs, ys) for a CSV file: its number of points and the
+        distinct x and y values. Read once per run.
+        """
+        if path not in self.csv_scans:
+            count = 0
+            xs = set()
+            ys = set()
+            for px, py in _read_csv_points(path):
+                count += 1
+                xs.add(px)
+                ys.add(py)
+            self.csv_scans[path] = (count, xs, ys)
+        return self.csv_scans[path]
+
+    def csv_count(self, path):
+        """Returns the number of points in a CSV file, counted once per run."""
+        return self.scan_csv(path)[0]
+
+    def csv_point(self, action, loop_index):
+        """Returns the point of a per-loop CSV template for the given loop, or None."""
+        cursor = self.cursors.get(id(action))
+        if cursor is None:
+            cursor = self.cursors[id(action)] = _CsvCursor(action["path"])
+        return cursor.point(loop_index)
+
+    def close(self):
+        for cursor in self.cursors.values():
+            cursor.close()
+        self.cursors.clear()
+
+
+def parse_offsets(text):
+    """
+    Parses offsets written as "dx,dy; dx,dy; ..." into a list of tuples.
+    Raises ValueError on malformed input.
+    """
+    offsets = []
+    for part in text.split(";"):
+        part = part.strip()
+        if not part:
+            continue
+        try:
+            dx, dy = part.split(",")
+            offsets.append((int(dx), int(dy)))
+        except ValueError:
+            raise ValueError(f"Invalid offset: {part}")
+    return offsets
+
+
+def format_offsets(offsets):
+    """Inverse of parse_offsets."""
+    return "; ".join(f"{dx},{dy}" for dx, dy in offsets)
+
+
+def template_points(action, loop_index=None, run=None):
+    """
+    Yields the (x, y) points of a template action.
+    When the template is bound per loop, loop_index selects the row/point.
+    run is an optional TemplateRun shared by every loop of a run.
+    """
+    kind = action["template"]
+    bound = loop_index if action.get("per_loop", False) else None
+
+    if kind == TEMPLATE_GRID:
+        return grid_points(
+            action["x"], action["y"],
+            action["rows"], action["cols"],
+            action["dx"], action["dy"],
+            row=bound
+        )
+    elif kind == TEMPLATE_OFFSETS:
+        return offset_points(action["x"], action["y"], action["offsets"], index=bound)
+    elif kind == TEMPLATE_CSV:
+        if bound is not None and run is not None:
+            point = run.csv_point(action, bound)
+            return iter([point] if point is not None else [])
+        return csv_points(action["path"], index=bound)
+
+    raise ValueError(f"Unknown template: {kind}")
+
+
+def expand_action(action, loop_index=None, run=None):
+    """
+    Yields the concrete actions for one entry of the action list.
+    Plain actions are yielded as-is; templates are expanded lazily
+    into mouse click actions, one per generated point.
+    """
+    if action["type"] != "template":
+        yield action
+        return
+
+    button = action.get("button", 1)
+    duration = action.get("duration", 100)
+    for px, py in template_points(action, loop_index, run):
+        yield {
+            "type": "mouse",
+            "x": px,
+            "y": py,
+            "button": button,
+            "duration": duration,
+            "drag": False
+        }
+
+
+def expand_actions(actions, loop_index=None, run=None):
+    """
+    Lazily expands a whole action list for the given loop.
+    Pass the same TemplateRun for every loop of a run so per-loop CSV
+    templates read each row once per pass through the file.
+    """
+    for action in actions:
+        yield from expand_action(action, loop_index, run)
+
+
+def actions_per_loop(actions, run):
+    """
+    Returns how many actions one loop executes, computed from the template
+    parameters rather than by expanding them.
+    """
+    count = 0
+    for action in actions:
+        if action["type"] != "template":
+            count += 1
+            continue
+
+        kind = action["template"]
+        per_loop = action.get("per_loop", False)
+        if kind == TEMPLATE_GRID:
+            rows = max(int(action["rows"]), 0)
+            cols = max(int(action["cols"]), 0)
+            count += cols if per_loop and rows else rows * cols
+        elif kind == TEMPLATE_OFFSETS:
+            n = len(action["offsets"])
+            count += min(n, 1) if per_loop else n
+        elif kind == TEMPLATE_CSV:
+            count += 1 if per_loop else run.csv_count(action["path"])
+    return count
+
+
+def coordinate_axes(actions, run):
+    """
+    Returns the sets of every x and every y the actions can click,
+    collected from the template parameters rather than generated actions.
+    """
+    xs = set()
+    ys = set()
+    for action in actions:
+        if action["type"] == "mouse":
+            xs.add(action["x"])
+            ys.add(action["y"])
+            if action.get("drag", False):
+                xs.add(action["end_x"])
+                ys.add(action["end_y"])
+            continue
+        if action["type"] != "template":
+            continue
+
+        kind = action["template"]
+        if kind == TEMPLATE_GRID:
+            if int(action["rows"]) > 0 and int(action["cols"]) > 0:
+                xs.update(int(action["x"]) + c * int(action["dx"]) for c in range(int(action["cols"])))
+                ys.update(int(action["y"]) + r * int(action["dy"]) for r in range(int(action["rows"])))
+        elif kind == TEMPLATE_OFFSETS:
+            xs.update(int(action["x"]) + int(dx) for dx, dy in action["offsets"])
+            ys.update(int(action["y"]) + int(dy) for dx, dy in action["offsets"])
+        elif kind == TEMPLATE_CSV:
+            count, csv_xs, csv_ys = run.scan_csv(action["path"])
+            xs.update(csv_xs)
+            ys.update(csv_ys)
+    return xs, ys
+
+
+def describe_template(action):
+    """Returns a short human-readable description of a template action."""
+    kind = action["template"]
+    if kind == TEMPLATE_GRID:
+        desc = f"Grid {action['rows']}x{action['cols']} at ({action['x']},{action['y']}) step ({action['dx']},{action['dy']})"
+    elif kind == TEMPLATE_OFFSETS:
+        desc = f"{len(action['offsets'])} offsets from ({action['x']},{action['y']})"
+    elif kind == TEMPLATE_CSV:
+        desc = f"Points from {action['path']}"
+    else:
+        desc = "?"
+
+    if action.get("per_loop", False):
+        desc += " [per loop]"
+    return desc
@@ -0,0 +1,96 @@
+import pytest
+
+import autoclicker
+from autoclicker import AutoClicker
+from coordspace import CoordinateSpace, FakeLayout
+
+
+class FakeUser32:
+    """Records the input calls AutoClicker makes."""
+
+    def __init__(self):
+        self.mouse_events = []
+        self.cursor_moves = []
+
+    def mouse_event(self, flags, dx, dy, data, extra):
+        self.mouse_events.append((flags, dx, dy, data))
+
+    def SetCursorPos(self, x, y):
+        self.cursor_moves.append((x, y))
+
+
+@pytest.fixture
+def no_sleep(monkeypatch):
+    monkeypatch.setattr(autoclicker.time, "sleep", lambda s: None)
+
+
+def to_pixel(n, origin, size):
+    """Windows' conversion from a normalized coordinate back to a pixel."""
+    return origin + n * size // 65536
+
+
+@pytest.mark.parametrize("layout", [
+    (0, 0, 1920, 1080),
+    (0, 0, 1366, 768),
+    # Secondary monitor to the left of and above the primary
+    (-1920, -1080, 3840, 2160),
+])
+def test_normalize_round_trips_every_pixel(layout):
+    left, top, width, height = layout
+    space = CoordinateSpace(FakeLayout(*layout))
+    for x in range(left, left + width):
+        nx, _ = space.normalize(x, top)
+        assert to_pixel(nx, left, width) == x
+    for y in range(top, top + height):
+        _, ny = space.normalize(left, y)
+        assert to_pixel(ny, top, height) == y
+
+
+def test_normalize_clamps_off_desktop():
+    space = CoordinateSpace(FakeLayout(0, 0, 1920, 1080))
+    assert space.normalize(-10, 5000) == (0, 65535)
+
+
+def test_prepare_requeries_layout_and_rebuilds_tables():
+    layout = FakeLayout(0, 0, 1920, 1080)
+    space = CoordinateSpace(layout)
+    space.prepare([{"type": "mouse", "x": 1919, "y": 0}, {"type": "key", "code": 0x41}])
+    assert list(space.x_table) == [1919]
+    assert to_pixel(space.x_table[1919], 0, 1920) == 1919
+
+    layout.layout = (0, 0, 3840, 1080)
+    space.prepare([{"type": "mouse", "x": 100, "y": 0, "drag": True, "end_x": 3839, "end_y": 1079}])
+    assert layout.queries == 3
+    assert sorted(space.x_table) == [100, 3839]
+    assert [to_pixel(space.x_table[x], 0, 3840) for x in (100, 3839)] == [100, 3839]
+    assert sorted(space.y_table) == [0, 1079]
+
+
+def test_click_moves_inside_the_press_event(no_sleep):
+    user32 = FakeUser32()
+    bot = AutoClicker(layout=FakeLayout(0, 0, 1920, 1080), user32=user32)
+    bot.mouseMove(1919, 0)
+    bot.clickMouse(AutoClicker.BUTTON_RIGHT, 0, 0)
+
+    nx, ny = bot.space.normalize(1919, 0)
+    assert user32.cursor_moves == []
+    assert user32.mouse_events == [
+        (AutoClicker.MOUSEEVENTF_RIGHTDOWN | AutoClicker.MOUSEEVENTF_MOVE_ABSOLUTE, nx, ny, 0),
+        (AutoClicker.MOUSEEVENTF_RIGHTUP, 0, 0, 0),
+    ]
+
+
+def test_drag_moves_with_absolute_events(no_sleep):
+    user32 = FakeUser32()
+    bot = AutoClicker(layout=FakeLayout(0, 0, 1920, 1080), user32=user32)
+    bot.mouseDrag(0, 0, 1919, 1079, AutoClicker.BUTTON_LEFT, 0)
+
+    move = AutoClicker.MOUSEEVENTF_MOVE | AutoClicker.MOUSEEVENTF_ABSOLUTE | AutoClicker.MOUSEEVENTF_VIRTUALDESK
+    start = bot.space.normalize(0, 0)
+    end = bot.space.normalize(1919, 1079)
+    assert user32.cursor_moves == []
+    assert user32.mouse_events == [
+        (AutoClicker.MOUSEEVENTF_LEFTDOWN | move, *start, 0),
+        (move, *end, 0),
+        (AutoClicker.MOUSEEVENTF_LEFTUP, 0, 0, 0),
+    ]
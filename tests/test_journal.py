@@ -0,0 +1,105 @@
+import gzip
+import json
+import os
+import time
+
+from journal import RunJournal
+
+
+def read_lines(path):
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def test_records_are_written_as_json_lines(tmp_path):
+    path = str(tmp_path / "journal.jsonl")
+    journal = RunJournal(path)
+    journal.record("run_start", loops=2)
+    journal.record("action", index=1, elapsed_ms=1.5)
+    journal.close()
+
+    records = read_lines(path)
+    assert [r["event"] for r in records] == ["run_start", "action"]
+    assert records[0]["loops"] == 2
+    assert records[1]["elapsed_ms"] == 1.5
+    assert all("ts" in r for r in records)
+
+
+def test_rotation_keeps_backup_count_compressed(tmp_path):
+    path = str(tmp_path / "journal.jsonl")
+    journal = RunJournal(path, max_bytes=500, backup_count=2, compress=True, batch_size=5)
+    for i in range(200):
+        journal.record("action", index=i)
+    journal.close()
+
+    assert sorted(os.listdir(tmp_path)) == ["journal.jsonl", "journal.jsonl.1.gz", "journal.jsonl.2.gz"]
+    newest = read_lines(path + ".1.gz") + read_lines(path)
+    assert newest[-1]["index"] == 199
+    # Rotated files hold consecutive records, oldest first
+    indexes = [r["index"] for r in read_lines(path + ".2.gz") + newest]
+    assert indexes == list(range(indexes[0], 200))
+
+
+def test_rotation_without_compression(tmp_path):
+    path = str(tmp_path / "journal.jsonl")
+    journal = RunJournal(path, max_bytes=200, backup_count=1, batch_size=5)
+    for i in range(50):
+        journal.record("action", index=i)
+    journal.close()
+
+    assert sorted(os.listdir(tmp_path)) == ["journal.jsonl", "journal.jsonl.1"]
+
+
+def test_dropped_records_are_reported(tmp_path):
+    path = str(tmp_path / "journal.jsonl")
+    journal = RunJournal(path)
+    journal.dropped = 3
+    journal.record("action", index=1)
+    journal.close()
+
+    records = read_lines(path)
+    assert records[-1]["event"] == "dropped"
+    assert records[-1]["count"] == 3
+
+
+def test_unwritable_path_sets_error(tmp_path):
+    journal = RunJournal(str(tmp_path / "missing" / "journal.jsonl"))
+    journal._thread.join()
+    assert isinstance(journal.error, OSError)
+
+    journal.record("action", index=1)
+    assert journal.queue.empty()
+    journal.close()
+
+
+class CountingJournal(RunJournal):
+    """Counts the writes that reach the journal file."""
+
+    writes = 0
+
+    def _open(self):
+        f = super()._open()
+        journal = self
+
+        class CountingFile:
+            def write(self, data):
+                journal.writes += 1
+                return f.write(data)
+
+            def __getattr__(self, name):
+                return getattr(f, name)
+
+        return CountingFile()
+
+
+def test_slow_records_are_batched(tmp_path):
+    path = str(tmp_path / "journal.jsonl")
+    journal = CountingJournal(path, linger=0.5)
+    for i in range(10):
+        journal.record("action", index=i)
+        time.sleep(0.02)
+    journal.close()
+
+    assert [r["index"] for r in read_lines(path)] == list(range(10))
+    assert journal.writes < 10
@@ -0,0 +1,67 @@
+import pytest
+
+import progress
+from progress import RunProgress, nominal_ms
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(progress.time, "perf_counter", clock)
+    return clock
+
+
+def test_new_progress_is_idle():
+    assert RunProgress().running is False
+
+
+def test_start_clears_previous_status():
+    p = RunProgress()
+    p.start(1, 1)
+    p.status = "stopped"
+    p.running = False
+    p.start(1, 1)
+    assert p.status is None
+    assert p.running is True
+
+
+def test_sample_before_count_is_published(clock):
+    p = RunProgress()
+    p.start(3, 0)
+    clock.now += 1.0
+    assert p.sample() == (0.0, 0.0, None)
+
+
+def test_sample_fraction_rate_and_eta(clock):
+    p = RunProgress()
+    p.start(2, 10)
+
+    clock.now += 2.0
+    p.actions_done = 5
+    fraction, rate, eta = p.sample()
+    assert fraction == 0.25
+    # 2.5 actions/s instant, smoothed from zero
+    assert rate == pytest.approx(RunProgress.RATE_SMOOTHING * 2.5)
+    # 15 actions left at the run's average of 2.5 actions/s
+    assert eta == pytest.approx(6.0)
+
+    clock.now += 1.0
+    p.actions_done = 20
+    fraction, rate, eta = p.sample()
+    assert fraction == 1.0
+    assert eta == 0
+
+
+def test_nominal_ms():
+    assert nominal_ms({"type": "key", "duration": 50}, 300) == 350
+    assert nominal_ms({"type": "mouse", "button": 1, "duration": 50}, 300) == 350
+    assert nominal_ms({"type": "mouse", "button": 1, "drag": True, "duration": 50}, 300) == 150
+    assert nominal_ms({"type": "mouse", "button": 4}, 300) == 0
@@ -0,0 +1,129 @@
+import pytest
+
+import templates
+from templates import (
+    TemplateRun, actions_per_loop, coordinate_axes, grid_points, offset_points, csv_points, csv_count,
+    parse_offsets, format_offsets, expand_actions
+)
+
+
+def test_grid_points_row_major():
+    assert list(grid_points(10, 20, 2, 3, 5, 7)) == [
+        (10, 20), (15, 20), (20, 20),
+        (10, 27), (15, 27), (20, 27),
+    ]
+
+
+def test_grid_points_row_wraps():
+    assert list(grid_points(10, 20, 2, 2, 5, 7, row=3)) == [(10, 27), (15, 27)]
+
+
+def test_grid_points_empty():
+    assert list(grid_points(0, 0, 0, 5, 1, 1)) == []
+
+
+def test_offset_points():
+    assert list(offset_points(100, 50, [(1, 2), (-3, 4)])) == [(101, 52), (97, 54)]
+    assert list(offset_points(100, 50, [(1, 2), (-3, 4)], index=3)) == [(97, 54)]
+    assert list(offset_points(100, 50, [], index=0)) == []
+
+
+@pytest.fixture
+def points_csv(tmp_path):
+    path = tmp_path / "points.csv"
+    path.write_text("x,y\n1,2\n\n3,4\nbad,row\n5,6\n")
+    return str(path)
+
+
+def test_csv_points_skips_header_and_bad_rows(points_csv):
+    assert list(csv_points(points_csv)) == [(1, 2), (3, 4), (5, 6)]
+    assert csv_count(points_csv) == 3
+
+
+def test_csv_points_index_wraps(points_csv):
+    assert list(csv_points(points_csv, index=1)) == [(3, 4)]
+    assert list(csv_points(points_csv, index=5, count=3)) == [(5, 6)]
+
+
+def test_parse_offsets_round_trip():
+    offsets = parse_offsets(" 1,2 ; -3,4; ")
+    assert offsets == [(1, 2), (-3, 4)]
+    assert parse_offsets(format_offsets(offsets)) == offsets
+
+
+def test_parse_offsets_malformed():
+    with pytest.raises(ValueError, match="Invalid offset: 1,2,3"):
+        parse_offsets("1,2,3")
+
+
+def test_expand_actions_mixes_plain_and_template():
+    key = {"type": "key", "code": 0x41}
+    grid = {
+        "type": "template", "template": "grid", "button": 2, "duration": 50,
+        "x": 0, "y": 0, "rows": 1, "cols": 2, "dx": 10, "dy": 0
+    }
+    expanded = list(expand_actions([key, grid]))
+    assert expanded[0] is key
+    assert [(a["x"], a["y"], a["button"], a["duration"]) for a in expanded[1:]] == [
+        (0, 0, 2, 50), (10, 0, 2, 50)
+    ]
+
+
+def test_expand_actions_per_loop(points_csv):
+    grid = {
+        "type": "template", "template": "grid", "per_loop": True,
+        "x": 0, "y": 0, "rows": 2, "cols": 1, "dx": 0, "dy": 10
+    }
+    csv_action = {"type": "template", "template": "csv", "path": points_csv, "per_loop": True}
+    run = TemplateRun()
+    loops = [[(a["x"], a["y"]) for a in expand_actions([grid, csv_action], l, run)] for l in range(4)]
+    run.close()
+    assert loops == [
+        [(0, 0), (1, 2)],
+        [(0, 10), (3, 4)],
+        [(0, 0), (5, 6)],
+        [(0, 10), (1, 2)],
+    ]
+
+
+def test_per_loop_csv_parses_each_row_once_per_pass(tmp_path, monkeypatch):
+    path = tmp_path / "points.csv"
+    path.write_text("".join(f"{i},{i}\n" for i in range(5)))
+    parsed = []
+    parse_row = templates._parse_row
+    monkeypatch.setattr(templates, "_parse_row", lambda row: parsed.append(row) or parse_row(row))
+
+    action = {"type": "template", "template": "csv", "path": str(path), "per_loop": True}
+    run = TemplateRun()
+    points = []
+    for l in range(10):
+        # Expanding a loop twice must not advance the reader
+        list(expand_actions([action], l, run))
+        points += [(a["x"], a["y"]) for a in expand_actions([action], l, run)]
+    run.close()
+
+    assert points == [(i % 5, i % 5) for i in range(10)]
+    # Two passes through a 5 row file
+    assert len(parsed) == 10
+
+
+def test_actions_per_loop_and_axes_match_expansion(points_csv):
+    actions = [
+        {"type": "key", "code": 0x41},
+        {"type": "mouse", "x": 7, "y": 8, "button": 1, "drag": True, "end_x": 9, "end_y": 10},
+        {"type": "template", "template": "grid", "x": 0, "y": 0, "rows": 3, "cols": 4, "dx": 10, "dy": 20},
+        {"type": "template", "template": "grid", "per_loop": True, "x": 0, "y": 0, "rows": 3, "cols": 4, "dx": 10, "dy": 20},
+        {"type": "template", "template": "offsets", "x": 100, "y": 100, "offsets": [(1, 2), (-3, 4)]},
+        {"type": "template", "template": "offsets", "per_loop": True, "x": 100, "y": 100, "offsets": [(1, 2), (-3, 4)]},
+        {"type": "template", "template": "csv", "path": points_csv},
+        {"type": "template", "template": "csv", "path": points_csv, "per_loop": True},
+    ]
+    run = TemplateRun()
+    expected = list(expand_actions(actions, 0, run))
+    assert actions_per_loop(actions, run) == len(expected)
+
+    xs, ys = coordinate_axes(actions, run)
+    mouse = [a for a in expand_actions(actions) if a["type"] == "mouse"]
+    assert xs == {a["x"] for a in mouse} | {9}
+    assert ys == {a["y"] for a in mouse} | {10}
+    run.close()